@@ -5,40 +5,50 @@ from dotenv import load_dotenv
 from openai import OpenAI
 
 
+# 修改系统提示词或 build_prompt 时递增，历史记录会保存该版本号
+PROMPT_VERSION = 1
+
+
+def create_client():
+    """读取.env配置并创建OpenAI客户端，返回 (client, model_name)"""
+    for key in ['OPENAI_API_KEY', 'OPENAI_BASE_URL', 'OPENAI_MODEL_NAME']:
+        if key in os.environ:
+            del os.environ[key]
+
+    load_dotenv(override=True)
+
+    api_key = os.environ.get('OPENAI_API_KEY')
+    base_url = os.environ.get('OPENAI_BASE_URL')
+
+    if not api_key:
+        raise Exception("未找到OpenAI API密钥，请在.env文件中设置OPENAI_API_KEY")
+
+    client_kwargs = {'api_key': api_key}
+    if base_url:
+        client_kwargs['base_url'] = base_url.rstrip('/')
+    return OpenAI(**client_kwargs), os.environ.get('OPENAI_MODEL_NAME', 'gpt-3.5-turbo')
+
+
 class AIAnalysisWorker:
     """AI分析工作器 - CLI版本（使用标准线程）"""
 
-    def __init__(self, question, cards):
+    def __init__(self, question, cards, client=None, model_name=None):
         self.question = question
         self.cards = cards
-        self.client = None
+        self.client = client
+        self.model_name = model_name or 'gpt-3.5-turbo'
         self.on_update = None  # 回调函数: on_update(text)
         self.on_complete = None  # 回调函数: on_complete(text)
         self.on_error = None  # 回调函数: on_error(text)
 
-        # 从环境变量或配置文件加载OpenAI API密钥并创建客户端
-        self.load_api_key()
+        # 未传入客户端时，从环境变量或配置文件加载OpenAI API密钥并创建客户端
+        if self.client is None:
+            self.load_api_key()
 
     def load_api_key(self):
         """加载OpenAI API密钥并创建客户端"""
         try:
-            for key in ['OPENAI_API_KEY', 'OPENAI_BASE_URL', 'OPENAI_MODEL_NAME']:
-                if key in os.environ:
-                    del os.environ[key]
-
-            load_dotenv(override=True)
-
-            api_key = os.environ.get('OPENAI_API_KEY')
-            base_url = os.environ.get('OPENAI_BASE_URL')
-
-            if api_key:
-                client_kwargs = {'api_key': api_key}
-                if base_url:
-                    client_kwargs['base_url'] = base_url.rstrip('/')
-                self.client = OpenAI(**client_kwargs)
-                self.model_name = os.environ.get('OPENAI_MODEL_NAME', 'gpt-3.5-turbo')
-            else:
-                raise Exception("未找到OpenAI API密钥，请在.env文件中设置OPENAI_API_KEY")
+            self.client, self.model_name = create_client()
         except Exception as e:
             if self.on_error:
                 self.on_error(f"加载API密钥失败: {str(e)}")
@@ -1,12 +1,12 @@
 import os
 import sys
-import json
 import re
 import threading
 import time
-from datetime import datetime
 from tarot_deck import TarotDeck
-from ai_analysis import AIAnalysisWorker
+from ai_analysis import AIAnalysisWorker, PROMPT_VERSION
+from history_store import HistoryStore, build_history_item, resolve_cards
+from history_export import export_history, import_history
 
 # 尝试使用prompt_toolkit实现现代化CLI补全
 try:
@@ -29,8 +29,8 @@ except ImportError:
 class CLITarotApp:
     def __init__(self):
         self.deck = TarotDeck()
+        self.history_store = HistoryStore()
         self.history = []
-        self.history_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tarot_history.json')
         self.load_history()
 
         # 初始化现代化CLI输入系统
@@ -50,7 +50,7 @@ class CLITarotApp:
 
                 # 设置命令补全器
                 self.command_completer = WordCompleter(
-                    ['/history', '/quit', '/exit', '/help'],
+                    ['/history', '/export', '/import', '/quit', '/exit', '/help'],
                     ignore_case=True,
                     sentence=True
                 )
@@ -80,27 +80,13 @@ class CLITarotApp:
 
     def load_history(self):
         """加载历史记录"""
-        try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    self.history = json.load(f)
-        except Exception as e:
-            print(f"加载历史记录失败: {str(e)}")
-            self.history = []
-
-    def save_history(self):
-        """保存历史记录"""
-        try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存历史记录失败: {str(e)}")
+        self.history = self.history_store.load()
 
     def setup_readline_completion(self):
         """设置readline命令补全"""
         # 定义补全函数
         def completer(text, state):
-            options = ['/history', '/quit', '/exit']
+            options = ['/history', '/export', '/import', '/quit', '/exit']
             matches = [option for option in options if option.startswith(text)]
             if state < len(matches):
                 return matches[state]
@@ -136,11 +122,33 @@ class CLITarotApp:
         print(f"\n问题: {history_item['question']}")
         print(f"抽牌模式: {draw_mode_text}")
         print("\n抽取的牌:")
-        for card in history_item['cards']:
+        for card in resolve_cards(history_item):
             print(f"  {card['name']} ({card['orientation']}) - {card['meaning']}")
         print(f"\n解读结果:\n{history_item['analysis']}")
         input("\n按回车返回...")
 
+    def export_history(self, path):
+        """导出全部历史记录（含归档）到 .jsonl/.csv 文件，可加 .gz 压缩"""
+        if not path:
+            print("用法: /export <文件路径>，例如 /export history.jsonl.gz")
+            return
+        try:
+            count = export_history(self.history_store, path)
+            print(f"已导出 {count} 条记录到 {path}")
+        except Exception as e:
+            print(f"导出历史记录失败: {str(e)}")
+
+    def import_history(self, path):
+        """从 .jsonl/.csv 文件导入历史记录到归档"""
+        if not path:
+            print("用法: /import <文件路径>，例如 /import history.jsonl.gz")
+            return
+        try:
+            count = import_history(self.history_store, path)
+            print(f"已导入 {count} 条记录到历史归档")
+        except Exception as e:
+            print(f"导入历史记录失败: {str(e)}")
+
     def parse_manual_indices(self, raw_text, expected_count, max_index):
         normalized_text = raw_text.replace('，', ',').strip()
         tokens = [item for item in re.split(r'[\s,]+', normalized_text) if item]
@@ -257,21 +265,11 @@ class CLITarotApp:
             print(analysis)
 
             # 保存到历史记录
-            history_item = {
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'question': question,
-                'draw_mode': draw_mode,
-                'cards': [{
-                    'name': card.name,
-                    'orientation': card.orientation,
-                    'meaning': card.meaning,
-                    'interpretation': card.get_interpretation()
-                } for card in drawn_cards],
-                'analysis': analysis
-            }
-
-            self.history.append(history_item)
-            self.save_history()
+            history_item = build_history_item(question, draw_mode, drawn_cards, analysis,
+                                              seed=self.deck.seed, prompt_version=PROMPT_VERSION)
+
+            # 通过存储追加，与守护进程一样在写入前合并磁盘记录并按需轮转
+            self.history_store.append(history_item)
 
             # 询问是否复制牌面信息
             copy_choice = input("\n是否复制牌面信息? (y/n): ").strip().lower()
@@ -283,6 +281,7 @@ class CLITarotApp:
         print("=== AI 塔罗牌占卜 (CLI版本) ===")
         print("输入 '/quit' 或 '/exit' 退出程序")
         print("输入 '/history' 查看历史记录")
+        print("输入 '/export <文件>' 或 '/import <文件>' 导出或导入历史记录")
 
         if self.input_method == "prompt_toolkit":
             print("使用 Tab 键可以补全命令")
@@ -318,6 +317,13 @@ class CLITarotApp:
                 elif command.lower() == '/history':
                     self.show_history()
                     continue
+                elif command.lower().split(' ', 1)[0] in ['/export', '/import']:
+                    name, _, path = command.partition(' ')
+                    if name.lower() == '/export':
+                        self.export_history(path.strip())
+                    else:
+                        self.import_history(path.strip())
+                    continue
                 elif not command:
                     continue
 
@@ -0,0 +1,138 @@
+import os
+import csv
+import gzip
+import json
+from datetime import datetime
+from history_store import iter_jsonl, write_jsonl, migrate_item, resolve_cards
+from tarot_deck import get_card_catalog
+
+
+CSV_FIELDS = ['timestamp', 'question', 'draw_mode', 'seed', 'prompt_version', 'cards_json', 'cards', 'analysis']
+
+
+def detect_format(path):
+    """根据扩展名判断导出格式，支持 .jsonl / .csv 及其 .gz 压缩版本"""
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.jsonl'):
+        return 'jsonl'
+    if name.endswith('.csv'):
+        return 'csv'
+    raise ValueError("仅支持 .jsonl、.csv 或其 .gz 压缩文件")
+
+
+def open_text(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def item_to_row(item):
+    """把历史记录转换为 CSV 行，同时保留牌目录编号和可读的牌面文字"""
+    return {
+        'timestamp': item['timestamp'],
+        'question': item['question'],
+        'draw_mode': item.get('draw_mode', 'auto'),
+        'seed': '' if item.get('seed') is None else item['seed'],
+        'prompt_version': '' if item.get('prompt_version') is None else item['prompt_version'],
+        # 原样保存牌数据（含无法迁移的旧格式牌），保证导出后再导入不丢失信息
+        'cards_json': json.dumps(item['cards'], ensure_ascii=False, separators=(',', ':')),
+        'cards': '；'.join(f"{card['name']}({card['orientation']})" for card in resolve_cards(item)),
+        'analysis': item['analysis']
+    }
+
+
+def row_to_item(row):
+    """把 CSV 行还原为历史记录"""
+    return {
+        'timestamp': row['timestamp'],
+        'question': row['question'],
+        'draw_mode': row.get('draw_mode') or 'auto',
+        'seed': int(row['seed']) if row.get('seed') else None,
+        'prompt_version': int(row['prompt_version']) if row.get('prompt_version') else None,
+        'cards': json.loads(row['cards_json']),
+        'analysis': row['analysis']
+    }
+
+
+def validate_item(item, index):
+    """检查导入的记录，格式不正确时抛出 ValueError，避免把坏数据写入归档"""
+    if not isinstance(item, dict):
+        raise ValueError(f"第 {index} 条记录不是JSON对象")
+    for key in ['timestamp', 'question', 'analysis', 'cards']:
+        if key not in item:
+            raise ValueError(f"第 {index} 条记录缺少字段: {key}")
+    for key in ['timestamp', 'question', 'analysis']:
+        if not isinstance(item[key], str):
+            raise ValueError(f"第 {index} 条记录的 {key} 必须是字符串")
+    try:
+        datetime.strptime(item['timestamp'], '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        raise ValueError(f"第 {index} 条记录的时间格式错误: {item['timestamp']}")
+    if not isinstance(item['cards'], list):
+        raise ValueError(f"第 {index} 条记录的 cards 必须是列表")
+
+    catalog_size = len(get_card_catalog())
+    for card in item['cards']:
+        if isinstance(card, dict):
+            # 无法迁移的旧格式牌至少要有名称和正逆位，显示和导出时需要用到
+            if not isinstance(card.get('name'), str) or not isinstance(card.get('orientation'), str):
+                raise ValueError(f"第 {index} 条记录包含缺少名称或正逆位的牌")
+        elif isinstance(card, list) and len(card) == 2 and all(type(value) is int for value in card):
+            if not 0 <= card[0] < catalog_size:
+                raise ValueError(f"第 {index} 条记录的牌编号超出范围: {card[0]}")
+            if card[1] not in (0, 1):
+                raise ValueError(f"第 {index} 条记录的正逆位标记必须是 0 或 1: {card[1]}")
+        else:
+            raise ValueError(f"第 {index} 条记录的牌数据格式错误: {card}")
+    return item
+
+
+def iter_file_items(path):
+    """逐条读取并校验导出文件中的历史记录"""
+    if detect_format(path) == 'jsonl':
+        for index, item in enumerate(iter_jsonl(path), 1):
+            # 兼容导出自旧格式、仍带完整牌面信息的记录
+            yield migrate_item(validate_item(item, index))
+    else:
+        with open_text(path, 'r') as f:
+            for index, row in enumerate(csv.DictReader(f), 1):
+                try:
+                    item = row_to_item(row)
+                except (KeyError, TypeError, ValueError) as e:
+                    raise ValueError(f"第 {index} 条记录格式错误: {str(e)}")
+                yield validate_item(item, index)
+
+
+def write_export(store, path, export_format):
+    if export_format == 'jsonl':
+        return write_jsonl(path, store.iter_all())
+
+    count = 0
+    with open_text(path, 'w') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for item in store.iter_all():
+            writer.writerow(item_to_row(item))
+            count += 1
+    return count
+
+
+def export_history(store, path):
+    """把归档和当前历史记录流式导出到文件，返回导出条数"""
+    export_format = detect_format(path)
+    # 先写临时文件（保留 .gz 后缀以决定是否压缩），完成后再替换，失败时不留下残缺的导出文件
+    tmp_path = path[:-3] + '.tmp.gz' if path.endswith('.gz') else path + '.tmp'
+    try:
+        count = write_export(store, tmp_path, export_format)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return count
+
+
+def import_history(store, path):
+    """把导出文件流式写入新的归档，不加载到当前历史记录中，返回导入条数"""
+    detect_format(path)
+    return store.write_archive(iter_file_items(path), suffix='-import')
@@ -0,0 +1,313 @@
+import os
+import sys
+import gzip
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from tarot_deck import get_card_catalog, get_card_ids_by_name
+
+# fcntl 仅在类Unix系统上可用，Windows 下退化为仅进程内加锁
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+
+DEFAULT_HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tarot_history.json')
+
+# 历史文件格式版本
+# 1: 顶层为列表，每张牌保存完整的名称、含义和解释文字
+# 2: 顶层为 {"version": 2, "items": [...]}，每张牌只保存 [card_id, 逆位标记]
+HISTORY_VERSION = 2
+
+
+def env_int(name, default):
+    """读取整数环境变量，未设置或格式错误时使用默认值"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"环境变量 {name} 不是有效整数: {value}，使用默认值 {default}")
+        return default
+
+
+# 历史记录轮转：超过条数上限或天数上限的旧记录移入 history_archive/ 下的 gzip 压缩 JSONL 归档
+# 可通过环境变量调整，设为 0 表示不按该条件轮转
+MAX_LIVE_ITEMS = env_int('TAROT_HISTORY_MAX_ITEMS', 500)
+MAX_AGE_DAYS = env_int('TAROT_HISTORY_MAX_DAYS', 365)
+
+
+def build_history_item(question, draw_mode, cards, analysis, seed=None, prompt_version=None):
+    """根据一次占卜结果构建历史记录条目"""
+    return {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'question': question,
+        'draw_mode': draw_mode,
+        'seed': seed,
+        'prompt_version': prompt_version,
+        'cards': [[card.card_id, 0 if card.orientation == "正位" else 1] for card in cards],
+        'analysis': analysis
+    }
+
+
+def resolve_cards(history_item):
+    """从牌目录还原牌面文字，兼容旧格式中直接保存的牌面信息"""
+    catalog = get_card_catalog()
+    resolved = []
+    for card in history_item['cards']:
+        if isinstance(card, dict):
+            resolved.append(card)
+            continue
+
+        card_id, reversed_flag = card
+        entry = catalog[card_id]
+        resolved.append({
+            'name': entry.name,
+            'orientation': "逆位" if reversed_flag else "正位",
+            'meaning': entry.meaning,
+            'interpretation': entry.reversed_meaning if reversed_flag else entry.upright
+        })
+    return resolved
+
+
+def migrate_item(history_item):
+    """把旧格式条目中的牌面信息转换为 [card_id, 逆位标记]"""
+    ids_by_name = get_card_ids_by_name()
+    cards = []
+    for card in history_item['cards']:
+        if isinstance(card, dict) and card.get('name') in ids_by_name:
+            cards.append([ids_by_name[card['name']], 0 if card.get('orientation') == "正位" else 1])
+        else:
+            # 无法识别的牌保留原样，显示时直接使用
+            cards.append(card)
+
+    migrated = dict(history_item)
+    migrated.setdefault('seed', None)
+    migrated.setdefault('prompt_version', None)
+    migrated['cards'] = cards
+    return migrated
+
+
+def iter_jsonl(path):
+    """逐行读取 JSONL 文件（.gz 结尾时按 gzip 解压），内存占用与文件大小无关"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_jsonl(path, items):
+    """把可迭代的记录逐条写入 JSONL 文件，返回写入条数"""
+    opener = gzip.open if path.endswith('.gz') else open
+    count = 0
+    with opener(path, 'wt', encoding='utf-8') as f:
+        for item in items:
+            f.write(json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n')
+            count += 1
+    return count
+
+
+class HistoryStore:
+    """占卜历史记录存储（JSON文件）"""
+
+    def __init__(self, history_file=DEFAULT_HISTORY_FILE, max_items=MAX_LIVE_ITEMS, max_age_days=MAX_AGE_DAYS):
+        self.history_file = history_file
+        self.archive_dir = os.path.join(os.path.dirname(os.path.abspath(history_file)), 'history_archive')
+        self.max_items = max_items
+        self.max_age_days = max_age_days
+        self.items = []
+        self.lock = threading.Lock()  # 守护进程中多个连接会并发写入
+
+    @contextmanager
+    def file_lock(self):
+        """跨进程独占锁，防止 CLI 与守护进程同时写入时互相覆盖"""
+        with open(self.history_file + '.lock', 'a') as lock_file:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read_file(self):
+        """读取磁盘上的历史记录，返回 (记录列表, 是否为旧格式)"""
+        if not os.path.exists(self.history_file):
+            return [], False
+
+        with open(self.history_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if isinstance(data, list):
+            return data, True
+        if data.get('version') == HISTORY_VERSION:
+            return data['items'], False
+        raise ValueError(f"不支持的历史记录版本: {data.get('version')}")
+
+    def load(self):
+        """加载历史记录，遇到旧格式文件时自动迁移"""
+        with self.file_lock():
+            try:
+                self.items, legacy = self.read_file()
+            except Exception as e:
+                print(f"加载历史记录失败: {str(e)}")
+                self.items = []
+                return self.items
+
+            # 迁移失败时保留旧格式记录仅供显示，不做轮转和保存，以免覆盖原文件
+            if legacy and not self.migrate():
+                return self.items
+
+            if self.rotate():
+                self.save_unlocked()
+        return self.items
+
+    def migrate(self):
+        """将已加载的旧格式记录转换为紧凑格式，原文件备份为 .v1.bak
+
+        先完整写好新文件，再备份原文件并替换，任何一步失败时原文件都仍然存在，
+        内存中的记录也恢复为未迁移的状态。返回是否迁移成功。
+        """
+        original_items = list(self.items)
+        self.items[:] = [migrate_item(item) for item in self.items]
+        backup_file = self.history_file + '.v1.bak'
+        tmp_path = None
+        try:
+            tmp_path = self.write_temp()
+            os.replace(self.history_file, backup_file)
+            os.replace(tmp_path, self.history_file)
+        except Exception as e:
+            print(f"迁移历史记录失败: {str(e)}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if not os.path.exists(self.history_file) and os.path.exists(backup_file):
+                os.replace(backup_file, self.history_file)
+            self.items[:] = original_items
+            return False
+        return True
+
+    def write_temp(self):
+        """把当前记录写入临时文件并返回其路径"""
+        tmp_path = f"{self.history_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': HISTORY_VERSION, 'items': self.items}, f,
+                          ensure_ascii=False, separators=(',', ':'))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return tmp_path
+
+    def save_unlocked(self):
+        """保存历史记录（调用方需已持有文件锁）"""
+        try:
+            # 先写临时文件再替换，写入中途失败不会破坏原文件
+            os.replace(self.write_temp(), self.history_file)
+        except Exception as e:
+            print(f"保存历史记录失败: {str(e)}")
+
+    def save(self):
+        """保存历史记录"""
+        with self.file_lock():
+            self.save_unlocked()
+
+    def append(self, item):
+        """追加一条记录并立即保存，返回是否保存成功
+
+        写入前会重新读取磁盘上的记录，保留其他进程（CLI 或守护进程）在此期间追加的内容。
+        磁盘上的文件无法解析或版本不受支持时放弃保存，避免覆盖用户的历史记录。
+        """
+        with self.lock, self.file_lock():
+            try:
+                disk_items, legacy = self.read_file()
+            except Exception as e:
+                print(f"历史记录文件无法读取，本条记录未保存: {str(e)}")
+                return False
+
+            self.items[:] = disk_items
+            if legacy and not self.migrate():
+                print("历史记录迁移失败，本条记录未保存")
+                return False
+            self.items.append(item)
+            self.rotate()
+            self.save_unlocked()
+            return True
+
+    def rotate(self):
+        """把过旧或超出条数上限的记录移入压缩归档，返回归档条数"""
+        keep_from = 0
+        if self.max_age_days > 0:
+            cutoff = (datetime.now() - timedelta(days=self.max_age_days)).strftime('%Y-%m-%d %H:%M:%S')
+            # 时间戳格式固定，可以直接按字符串比较
+            while keep_from < len(self.items) and self.items[keep_from]['timestamp'] < cutoff:
+                keep_from += 1
+        if self.max_items > 0 and len(self.items) - keep_from > self.max_items:
+            # 一次归档到只剩一半，避免每次保存都产生新的小归档
+            keep_from = len(self.items) - max(1, self.max_items // 2)
+
+        if keep_from == 0:
+            return 0
+
+        try:
+            self.write_archive(self.items[:keep_from])
+        except Exception as e:
+            # 归档失败时记录保留在当前文件中，不影响正常保存
+            print(f"归档历史记录失败: {str(e)}")
+            return 0
+        del self.items[:keep_from]
+        return keep_from
+
+    def write_archive(self, items, suffix=''):
+        """把记录写入新的归档文件，返回写入条数"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        name = f"tarot_history-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{suffix}.jsonl.gz"
+        path = os.path.join(self.archive_dir, name)
+        tmp_path = path[:-len('.jsonl.gz')] + '.jsonl.tmp.gz'
+
+        # 先写临时文件，中途出错时不会留下残缺的归档
+        try:
+            count = write_jsonl(tmp_path, items)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)
+        return count
+
+    def archive_files(self):
+        """按时间顺序列出归档文件"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        return [os.path.join(self.archive_dir, name) for name in sorted(os.listdir(self.archive_dir))
+                if name.endswith('.jsonl.gz')]
+
+    def iter_all(self):
+        """依次产出归档中和当前的全部记录"""
+        for path in self.archive_files():
+            for item in iter_jsonl(path):
+                yield item
+        for item in list(self.items):
+            yield item
+
+
+def main():
+    """手动迁移历史记录文件: python history_store.py [文件路径]"""
+    history_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_HISTORY_FILE
+    if not os.path.exists(history_file):
+        print(f"历史记录文件不存在: {history_file}")
+        return
+
+    old_size = os.path.getsize(history_file)
+    HistoryStore(history_file).load()
+    new_size = os.path.getsize(history_file)
+    print(f"{history_file}: {old_size} -> {new_size} 字节")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,36 @@
 import sys
-from cli_main import main as cli_main
+import argparse
 
 
 def main():
     """AI 塔罗牌占卜程序 - CLI 版本"""
+    parser = argparse.ArgumentParser(description='AI 塔罗牌占卜')
+    parser.add_argument('--export', metavar='FILE', dest='export_file',
+                        help='导出全部历史记录（含归档）到 .jsonl/.csv 文件，可加 .gz 压缩')
+    parser.add_argument('--import', metavar='FILE', dest='import_file',
+                        help='从 .jsonl/.csv 文件导入历史记录到归档')
+    args = parser.parse_args()
+
+    if args.export_file or args.import_file:
+        # 导入导出不需要加载 OpenAI 和 CLI 相关模块
+        from history_store import HistoryStore
+        from history_export import export_history, import_history
+
+        store = HistoryStore()
+        store.load()
+        try:
+            if args.export_file:
+                count = export_history(store, args.export_file)
+                print(f"已导出 {count} 条记录到 {args.export_file}")
+            if args.import_file:
+                count = import_history(store, args.import_file)
+                print(f"已导入 {count} 条记录到历史归档")
+        except Exception as e:
+            print(f"处理历史记录失败: {str(e)}")
+            sys.exit(1)
+        return
+
+    from cli_main import main as cli_main
     cli_main()
 
 
@@ -0,0 +1,86 @@
+"""塔罗牌守护进程的轻量客户端
+
+只依赖标准库，不导入 openai / prompt_toolkit，适合在脚本中频繁调用：
+
+    python tarot_daemon.py &
+    python tarot_client.py -n 3 "我最近的运势如何?"
+"""
+import sys
+import json
+import socket
+import argparse
+from tarot_socket import DEFAULT_SOCKET_PATH
+
+
+def send_request(request, socket_path=DEFAULT_SOCKET_PATH):
+    """发送一条请求，逐个产出服务端返回的事件"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(request, ensure_ascii=False) + '\n').encode('utf-8'))
+        with sock.makefile('rb') as stream:
+            for line in stream:
+                yield json.loads(line.decode('utf-8'))
+    finally:
+        sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AI 塔罗牌占卜 - 守护进程客户端')
+    parser.add_argument('question', nargs='?', help='要占卜的问题')
+    parser.add_argument('-n', '--num-cards', type=int, default=3, choices=[1, 3, 5, 7, 10],
+                        help='抽牌数量 (默认: 3)')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH, help='守护进程套接字路径')
+    parser.add_argument('--ping', action='store_true', help='检查守护进程是否在运行')
+    parser.add_argument('--stop', action='store_true', help='停止守护进程')
+    args = parser.parse_args()
+
+    if args.ping:
+        request = {'command': 'ping'}
+    elif args.stop:
+        request = {'command': 'shutdown'}
+    elif args.question:
+        request = {'command': 'read', 'question': args.question, 'num_cards': args.num_cards}
+    else:
+        parser.error('请提供问题，或使用 --ping / --stop')
+
+    completed = False
+    try:
+        for event in send_request(request, args.socket):
+            event_type = event.get('type')
+            if event_type == 'cards':
+                print(f"问题: {args.question}")
+                print("\n抽取的塔罗牌:")
+                for i, card in enumerate(event['cards'], 1):
+                    print(f"第{i}张: {card['name']} ({card['orientation']})")
+                    print(f"  基本含义: {card['meaning']}")
+                    print(f"  具体解释: {card['interpretation']}")
+                    print()
+                print("AI解读结果:")
+            elif event_type == 'delta':
+                sys.stdout.write(event['text'])
+                sys.stdout.flush()
+            elif event_type == 'pong':
+                completed = True
+                print(f"守护进程运行中 (pid {event['pid']})")
+            elif event_type == 'error':
+                print(f"\n出错: {event['message']}", file=sys.stderr)
+                sys.exit(1)
+            elif event_type == 'done':
+                completed = True
+                if request['command'] == 'read':
+                    print()
+                elif request['command'] == 'shutdown':
+                    print("守护进程已停止")
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"无法连接守护进程 ({args.socket})，请先运行: python tarot_daemon.py", file=sys.stderr)
+        sys.exit(1)
+
+    # 没有收到 done / pong 就断开，说明守护进程未完成请求
+    if not completed:
+        print("\n守护进程未完成请求，连接已中断", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
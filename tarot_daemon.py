@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import socket
+import socketserver
+import stat
+import threading
+from tarot_deck import TarotDeck
+from ai_analysis import AIAnalysisWorker, PROMPT_VERSION, create_client
+from history_store import HistoryStore, build_history_item, resolve_cards
+from tarot_socket import DEFAULT_SOCKET_PATH
+
+
+VALID_CARD_COUNTS = [1, 3, 5, 7, 10]
+
+
+class TarotRequestHandler(socketserver.StreamRequestHandler):
+    """处理单个客户端连接
+
+    协议为按行分隔的JSON：客户端发送一行请求，服务端逐行返回事件，
+    事件类型有 cards / delta / done / error / pong。
+    """
+
+    def send_event(self, event):
+        self.wfile.write((json.dumps(event, ensure_ascii=False) + '\n').encode('utf-8'))
+        self.wfile.flush()
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+
+        try:
+            request = json.loads(line.decode('utf-8'))
+        except ValueError:
+            self.send_event({'type': 'error', 'message': '请求格式错误'})
+            return
+
+        if not isinstance(request, dict):
+            self.send_event({'type': 'error', 'message': '请求必须是JSON对象'})
+            return
+
+        command = request.get('command', 'read')
+        try:
+            if command == 'ping':
+                self.send_event({'type': 'pong', 'pid': os.getpid()})
+            elif command == 'shutdown':
+                self.send_event({'type': 'done'})
+                # shutdown() 会等待serve_forever退出，不能在处理线程中同步调用
+                threading.Thread(target=self.server.shutdown).start()
+            elif command == 'read':
+                self.handle_reading(request)
+            else:
+                self.send_event({'type': 'error', 'message': f"未知命令: {command}"})
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端提前断开，放弃本次输出
+            pass
+        except Exception as e:
+            # 其他异常也要通知客户端，避免客户端误以为请求已完成
+            try:
+                self.send_event({'type': 'error', 'message': f"处理请求失败: {str(e)}"})
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    def handle_reading(self, request):
+        """抽牌、流式返回AI解读并写入历史记录"""
+        question = str(request.get('question', '')).strip()
+        num_cards = request.get('num_cards', 3)
+
+        if not question:
+            self.send_event({'type': 'error', 'message': '问题不能为空'})
+            return
+        # 排除 1.0、True 等与整数相等但类型不同的值
+        if type(num_cards) is not int or num_cards not in VALID_CARD_COUNTS:
+            self.send_event({'type': 'error', 'message': '抽牌数量必须是 1, 3, 5, 7 或 10'})
+            return
+        if self.server.client is None:
+            self.send_event({'type': 'error', 'message': f"未初始化OpenAI客户端: {self.server.client_error}"})
+            return
+
+        deck = TarotDeck()
+        drawn_cards = deck.draw(num_cards)
+        # 先构建历史记录条目，牌面文字与历史详情一样从牌目录还原
+        history_item = build_history_item(question, 'auto', drawn_cards, None,
+                                          seed=deck.seed, prompt_version=PROMPT_VERSION)
+        self.send_event({'type': 'cards', 'cards': resolve_cards(history_item)})
+
+        worker = AIAnalysisWorker(question, drawn_cards,
+                                  client=self.server.client, model_name=self.server.model_name)
+        result = {}
+        sent = [0]
+
+        def on_update(partial_text):
+            # worker回调的是累计文本，这里只转发新增部分
+            self.send_event({'type': 'delta', 'text': partial_text[sent[0]:]})
+            sent[0] = len(partial_text)
+
+        def on_complete(analysis):
+            result['analysis'] = analysis
+
+        def on_error(error_message):
+            result['error'] = error_message
+
+        worker.on_update = on_update
+        worker.on_complete = on_complete
+        worker.on_error = on_error
+
+        # 已在独立的连接线程中，直接同步运行即可
+        worker.run()
+
+        if 'error' in result:
+            self.send_event({'type': 'error', 'message': result['error']})
+            return
+
+        history_item['analysis'] = result['analysis']
+        saved = self.server.history_store.append(history_item)
+        if not saved:
+            self.send_event({'type': 'error', 'message': '解读已生成，但历史记录文件无法读取，本条记录未保存'})
+            return
+        self.send_event({'type': 'done'})
+
+
+class TarotDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """常驻后台服务，持有OpenAI客户端和已打开的历史记录"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, history_store=None, client=None, model_name=None):
+        self.socket_path = socket_path
+        self.history_store = history_store or HistoryStore()
+        self.history_store.load()
+
+        # 未传入客户端时按 .env 配置创建
+        self.client = client
+        self.model_name = model_name
+        self.client_error = None
+        if self.client is None:
+            try:
+                self.client, self.model_name = create_client()
+            except Exception as e:
+                self.client_error = str(e)
+
+        remove_stale_socket(socket_path)
+        socketserver.UnixStreamServer.__init__(self, socket_path, TarotRequestHandler)
+        os.chmod(socket_path, 0o600)
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def remove_stale_socket(socket_path):
+    """清理上次异常退出遗留的套接字文件；若已有守护进程在运行或路径不可用则报错"""
+    if not os.path.exists(socket_path):
+        return
+    # 不是套接字的文件可能是用户数据，不能删除
+    if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+        raise RuntimeError(f"套接字路径已被其他文件占用: {socket_path}")
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        try:
+            os.remove(socket_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            raise RuntimeError(f"无法清理遗留的套接字文件 {socket_path}: {str(e)}")
+        return
+    except OSError as e:
+        raise RuntimeError(f"无法连接套接字 {socket_path}: {str(e)}")
+    finally:
+        probe.close()
+    raise RuntimeError(f"守护进程已在运行: {socket_path}")
+
+
+def main():
+    socket_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SOCKET_PATH
+    try:
+        server = TarotDaemon(socket_path)
+    except RuntimeError as e:
+        print(str(e))
+        sys.exit(1)
+    except OSError as e:
+        print(f"守护进程启动失败: {str(e)}")
+        sys.exit(1)
+
+    if server.client is None:
+        print(f"警告: 未初始化OpenAI客户端: {server.client_error}")
+    print(f"塔罗牌守护进程已启动，监听 {socket_path}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("塔罗牌守护进程已退出")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,18 @@
 import random
 
+_card_catalog = None
+_card_ids_by_name = None
+
 class TarotCard:
-    def __init__(self, name, meaning, upright, reversed_meaning, suit=None, arcana="Major"):
+    def __init__(self, name, meaning, upright, reversed_meaning, suit=None, arcana="Major", card_id=None, rng=None):
+        self.card_id = card_id  # 在牌目录中的固定编号，历史记录中用它代替牌面文字
         self.name = name
         self.meaning = meaning
         self.upright = upright
         self.reversed_meaning = reversed_meaning
         self.suit = suit
         self.arcana = arcana
-        self.orientation = "正位" if random.random() > 0.5 else "逆位"
+        self.orientation = "正位" if (rng or random).random() > 0.5 else "逆位"
     
     def get_interpretation(self):
         if self.orientation == "正位":
@@ -19,7 +23,10 @@ class TarotCard:
         return f"{self.name} ({self.orientation})"
 
 class TarotDeck:
-    def __init__(self):
+    def __init__(self, seed=None):
+        # 记录随机种子，便于在历史记录中复现抽牌结果
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
         self.cards = self.create_deck()
         self.shuffle()
     
@@ -53,7 +60,8 @@ class TarotDeck:
         ]
         
         for name, meaning, upright, reversed_meaning, arcana in major_arcana:
-            cards.append(TarotCard(name, meaning, upright, reversed_meaning, arcana=arcana))
+            cards.append(TarotCard(name, meaning, upright, reversed_meaning, arcana=arcana,
+                                   card_id=len(cards), rng=self.rng))
         
         # 小阿卡纳牌 - 权杖（数字牌）
         wands = [
@@ -151,15 +159,17 @@ class TarotDeck:
         ):
             # 添加数字牌
             for name, meaning, upright, reversed_meaning, _ in suit_cards:
-                cards.append(TarotCard(name, meaning, upright, reversed_meaning, suit=suit_name, arcana="Minor"))
+                cards.append(TarotCard(name, meaning, upright, reversed_meaning, suit=suit_name, arcana="Minor",
+                                       card_id=len(cards), rng=self.rng))
             # 添加宫廷牌
             for name, meaning, upright, reversed_meaning, _ in suit_court:
-                cards.append(TarotCard(name, meaning, upright, reversed_meaning, suit=suit_name, arcana="Minor"))
+                cards.append(TarotCard(name, meaning, upright, reversed_meaning, suit=suit_name, arcana="Minor",
+                                       card_id=len(cards), rng=self.rng))
 
         return cards
     
     def shuffle(self):
-        random.shuffle(self.cards)
+        self.rng.shuffle(self.cards)
     
     def draw(self, num_cards):
         if num_cards > len(self.cards):
@@ -189,3 +199,19 @@ class TarotDeck:
             selected_cards[idx] = self.cards.pop(idx - 1)
 
         return [selected_cards[idx] for idx in normalized]
+
+
+def get_card_catalog():
+    """按 card_id 排列的完整牌目录（首次调用时构建）"""
+    global _card_catalog
+    if _card_catalog is None:
+        _card_catalog = TarotDeck(seed=0).create_deck()
+    return _card_catalog
+
+
+def get_card_ids_by_name():
+    """牌名到 card_id 的映射（首次调用时构建）"""
+    global _card_ids_by_name
+    if _card_ids_by_name is None:
+        _card_ids_by_name = {card.name: card.card_id for card in get_card_catalog()}
+    return _card_ids_by_name
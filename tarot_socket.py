@@ -0,0 +1,9 @@
+import os
+
+
+# 守护进程与客户端共用的套接字路径，可用环境变量 TAROT_SOCKET 覆盖
+# 该模块只依赖标准库，供轻量客户端导入
+DEFAULT_SOCKET_PATH = os.environ.get(
+    'TAROT_SOCKET',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.tarot_daemon.sock')
+)
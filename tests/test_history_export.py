@@ -0,0 +1,125 @@
+import json
+import os
+from unittest import mock
+
+import pytest
+
+from history_store import HistoryStore, build_history_item
+from history_export import export_history, import_history, iter_file_items
+from tarot_deck import TarotDeck
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / 'h.json'), max_items=10, max_age_days=0)
+    store.load()
+    for i in range(25):
+        deck = TarotDeck(seed=i)
+        item = build_history_item(f"问题{i}, \"引号\"\n换行", 'manual' if i % 2 else 'auto',
+                                  deck.draw(3), f"解读{i}\n第二行", seed=deck.seed, prompt_version=1)
+        item['timestamp'] = f"2026-10-19 12:00:{i:02d}"
+        store.append(item)
+
+    # 无法迁移的旧格式牌以字典形式保留
+    legacy = dict(store.items[-1])
+    legacy['cards'] = legacy['cards'] + [{'name': 'Unknown', 'orientation': '逆位', 'meaning': 'm', 'interpretation': 'i'}]
+    legacy['seed'] = None
+    legacy['prompt_version'] = None
+    store.items[-1] = legacy
+    store.save()
+    return store
+
+
+@pytest.mark.parametrize('name', ['out.jsonl', 'out.jsonl.gz', 'out.csv', 'out.csv.gz'])
+def test_export_round_trip(store, tmp_path, name):
+    path = str(tmp_path / name)
+    expected = list(store.iter_all())
+
+    assert export_history(store, path) == len(expected) == 25
+    assert list(iter_file_items(path)) == expected
+
+
+@pytest.mark.parametrize('name', ['out.jsonl.gz', 'out.csv.gz'])
+def test_import_writes_archive(store, tmp_path, name):
+    path = str(tmp_path / name)
+    export_history(store, path)
+    live_items = list(store.items)
+    expected = list(store.iter_all())
+
+    assert import_history(store, path) == 25
+
+    assert store.items == live_items
+    assert store.archive_files()[-1].endswith('-import.jsonl.gz')
+    # 归档按文件名排序，导入的归档排在轮转归档之后、当前记录之前
+    archived = expected[:len(expected) - len(live_items)]
+    assert list(store.iter_all()) == archived + expected + live_items
+
+
+def test_unsupported_format(store, tmp_path):
+    with pytest.raises(ValueError):
+        export_history(store, str(tmp_path / 'out.txt'))
+    with pytest.raises(ValueError):
+        import_history(store, str(tmp_path / 'out.txt'))
+
+
+def test_failed_import_leaves_no_archive(store, tmp_path):
+    path = tmp_path / 'bad.jsonl'
+    path.write_text('{"timestamp": "2026-10-19 12:00:00", "cards": []}\n{bad\n', encoding='utf-8')
+    archives = store.archive_files()
+
+    with pytest.raises(ValueError):
+        import_history(store, str(path))
+
+    assert store.archive_files() == archives
+    assert not [name for name in os.listdir(store.archive_dir) if '.tmp' in name]
+
+
+@pytest.mark.parametrize('record', [
+    {'timestamp': '2026-10-19 12:00:00', 'question': 'q', 'analysis': 'a', 'cards': [[500, 0]]},
+    {'timestamp': '2026-10-19 12:00:00', 'question': 'q', 'analysis': 'a', 'cards': [[1, 2]]},
+    {'timestamp': '2026-10-19 12:00:00', 'question': 'q', 'analysis': 'a', 'cards': [[1.0, 0]]},
+    {'timestamp': '2026-10-19 12:00:00', 'question': 'q', 'analysis': 'a', 'cards': [{'meaning': 'm'}]},
+    {'timestamp': 'yesterday', 'question': 'q', 'analysis': 'a', 'cards': []},
+    {'cards': [[1, 0]]},
+    [1, 2],
+])
+def test_import_rejects_invalid_records(store, tmp_path, record):
+    path = tmp_path / 'bad.jsonl'
+    path.write_text(json.dumps(record) + '\n', encoding='utf-8')
+    archives = store.archive_files()
+
+    with pytest.raises(ValueError):
+        import_history(store, str(path))
+
+    assert store.archive_files() == archives
+    export_history(store, str(tmp_path / 'after.csv'))
+
+
+def test_import_rejects_invalid_csv_row(store, tmp_path):
+    path = tmp_path / 'bad.csv'
+    export_history(store, str(path))
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        f.write('2026-10-19 12:00:00,q,auto,,,"[[500,0]]",x,a\n')
+    archives = store.archive_files()
+
+    with pytest.raises(ValueError):
+        import_history(store, str(path))
+
+    assert store.archive_files() == archives
+
+
+@pytest.mark.parametrize('name', ['out.jsonl.gz', 'out.csv'])
+def test_failed_export_leaves_no_file(store, tmp_path, name):
+    path = tmp_path / name
+    path.write_text('previous export', encoding='utf-8')
+
+    def broken_items():
+        yield store.items[0]
+        raise OSError('archive unreadable')
+
+    with mock.patch.object(store, 'iter_all', side_effect=broken_items):
+        with pytest.raises(OSError):
+            export_history(store, str(path))
+
+    assert path.read_text(encoding='utf-8') == 'previous export'
+    assert sorted(os.listdir(tmp_path)) == sorted(['h.json', 'h.json.lock', 'history_archive', name])
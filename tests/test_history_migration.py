@@ -0,0 +1,107 @@
+import json
+import os
+from unittest import mock
+
+import history_store
+from history_store import HistoryStore, build_history_item, resolve_cards, migrate_item
+from tarot_deck import TarotDeck
+
+
+def legacy_item(index):
+    cards = TarotDeck(seed=index).draw(3)
+    return {
+        'timestamp': '2026-10-19 12:00:00',
+        'question': f"问题{index}",
+        'draw_mode': 'auto',
+        'cards': [{
+            'name': card.name,
+            'orientation': card.orientation,
+            'meaning': card.meaning,
+            'interpretation': card.get_interpretation()
+        } for card in cards],
+        'analysis': f"解读{index}"
+    }
+
+
+def test_build_history_item_resolves_to_card_text():
+    deck = TarotDeck(seed=1)
+    cards = deck.draw(5)
+    item = build_history_item('问题', 'auto', cards, '解读', seed=deck.seed, prompt_version=1)
+
+    assert all(isinstance(card, list) for card in item['cards'])
+    assert resolve_cards(item) == [{
+        'name': card.name,
+        'orientation': card.orientation,
+        'meaning': card.meaning,
+        'interpretation': card.get_interpretation()
+    } for card in cards]
+
+
+def test_migrate_v1_file(tmp_path):
+    history_file = str(tmp_path / 'h.json')
+    legacy = [legacy_item(i) for i in range(20)]
+    legacy[0]['cards'].append({'name': 'Unknown', 'orientation': '正位', 'meaning': 'm', 'interpretation': 'i'})
+    with open(history_file, 'w', encoding='utf-8') as f:
+        json.dump(legacy, f, ensure_ascii=False, indent=2)
+    old_size = os.path.getsize(history_file)
+
+    items = HistoryStore(history_file).load()
+
+    assert os.path.getsize(history_file) < old_size
+    with open(history_file + '.v1.bak', encoding='utf-8') as f:
+        assert json.load(f) == legacy
+    with open(history_file, encoding='utf-8') as f:
+        data = json.load(f)
+    assert data['version'] == history_store.HISTORY_VERSION
+    assert [resolve_cards(item) for item in items] == [item['cards'] for item in legacy]
+    assert HistoryStore(history_file).load() == items
+
+
+def test_migrate_failure_keeps_original(tmp_path):
+    history_file = str(tmp_path / 'h.json')
+    legacy = [legacy_item(0)]
+    with open(history_file, 'w', encoding='utf-8') as f:
+        json.dump(legacy, f, ensure_ascii=False)
+
+    with mock.patch.object(HistoryStore, 'write_temp', side_effect=OSError('disk full')):
+        items = HistoryStore(history_file).load()
+
+    assert len(items) == 1
+    assert not os.path.exists(history_file + '.v1.bak')
+    with open(history_file, encoding='utf-8') as f:
+        assert json.load(f) == legacy
+
+
+def test_migrate_item_is_idempotent():
+    item = migrate_item(legacy_item(3))
+    assert migrate_item(item) == item
+
+
+def failing_backup_replace(real_replace):
+    """只让“原文件 -> .v1.bak”这一步失败的 os.replace"""
+    def replace(src, dst):
+        if dst.endswith('.v1.bak'):
+            raise OSError('permission denied')
+        return real_replace(src, dst)
+    return replace
+
+
+def test_migrate_backup_failure_does_not_save(tmp_path):
+    history_file = str(tmp_path / 'h.json')
+    legacy = [legacy_item(i) for i in range(5)]
+    with open(history_file, 'w', encoding='utf-8') as f:
+        json.dump(legacy, f, ensure_ascii=False)
+
+    # max_items=2 会触发轮转，确认迁移失败后不会继续轮转和保存
+    store = HistoryStore(history_file, max_items=2, max_age_days=0)
+    with mock.patch('os.replace', side_effect=failing_backup_replace(os.replace)):
+        items = store.load()
+        assert items == legacy
+        assert store.append(build_history_item('问题', 'auto', TarotDeck(seed=1).draw(1), '解读')) is False
+
+    assert not os.path.exists(history_file + '.v1.bak')
+    assert not os.path.exists(store.archive_dir)
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
+    with open(history_file, encoding='utf-8') as f:
+        assert json.load(f) == legacy
+
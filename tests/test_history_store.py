@@ -0,0 +1,101 @@
+import history_store
+from history_store import HistoryStore, build_history_item
+from tarot_deck import TarotDeck
+
+
+def make_item(index, timestamp='2026-10-19 12:00:00'):
+    deck = TarotDeck(seed=index)
+    item = build_history_item(f"问题{index}", 'auto', deck.draw(3), f"解读{index}",
+                              seed=deck.seed, prompt_version=1)
+    item['timestamp'] = timestamp
+    return item
+
+
+def test_append_keeps_records_from_other_store(tmp_path):
+    history_file = str(tmp_path / 'h.json')
+    cli_store = HistoryStore(history_file)
+    daemon_store = HistoryStore(history_file)
+    cli_store.load()
+    daemon_store.load()
+
+    cli_store.append(make_item(1))
+    daemon_store.append(make_item(2))
+
+    assert [item['question'] for item in HistoryStore(history_file).load()] == ['问题1', '问题2']
+
+
+def test_rotate_by_count(tmp_path):
+    history_file = str(tmp_path / 'h.json')
+    store = HistoryStore(history_file, max_items=10, max_age_days=0)
+    store.load()
+    appended = [make_item(i, f"2026-10-19 12:00:{i:02d}") for i in range(25)]
+    for item in appended:
+        store.append(item)
+
+    assert 0 < len(store.items) <= 10
+    assert store.archive_files()
+    assert list(store.iter_all()) == appended
+    assert HistoryStore(history_file, max_items=10, max_age_days=0).load() == store.items
+
+
+def test_rotate_keeps_one_item_at_max_items_one(tmp_path):
+    store = HistoryStore(str(tmp_path / 'h.json'), max_items=1, max_age_days=0)
+    store.load()
+    for i in range(3):
+        store.append(make_item(i))
+        assert len(store.items) == 1
+
+
+def test_rotate_by_age(tmp_path):
+    history_file = str(tmp_path / 'h.json')
+    store = HistoryStore(history_file, max_items=0, max_age_days=30)
+    store.load()
+    store.items.append(make_item(0, '2020-01-01 00:00:00'))
+    store.save()
+
+    store.append(make_item(1, '2099-01-01 00:00:00'))
+
+    assert [item['question'] for item in store.items] == ['问题1']
+    assert [item['question'] for item in store.iter_all()] == ['问题0', '问题1']
+
+
+def test_rotate_failure_still_saves(tmp_path, capsys):
+    history_file = str(tmp_path / 'h.json')
+    (tmp_path / 'history_archive').write_text('not a directory')
+    store = HistoryStore(history_file, max_items=2, max_age_days=0)
+    store.load()
+
+    for i in range(4):
+        store.append(make_item(i))
+
+    assert '归档历史记录失败' in capsys.readouterr().out
+    assert len(HistoryStore(history_file, max_items=0, max_age_days=0).load()) == 4
+
+
+def test_env_int_falls_back_on_invalid_value(monkeypatch):
+    monkeypatch.setenv('TAROT_HISTORY_MAX_ITEMS', 'abc')
+    assert history_store.env_int('TAROT_HISTORY_MAX_ITEMS', 500) == 500
+    monkeypatch.setenv('TAROT_HISTORY_MAX_ITEMS', '20')
+    assert history_store.env_int('TAROT_HISTORY_MAX_ITEMS', 500) == 20
+
+
+def test_append_refuses_to_overwrite_unsupported_file(tmp_path, capsys):
+    history_file = tmp_path / 'h.json'
+    history_file.write_text('{"version": 3, "items": [{"question": "future"}]}', encoding='utf-8')
+    original = history_file.read_text(encoding='utf-8')
+    store = HistoryStore(str(history_file))
+    store.load()
+
+    assert store.append(make_item(1)) is False
+    assert '本条记录未保存' in capsys.readouterr().out
+    assert history_file.read_text(encoding='utf-8') == original
+
+
+def test_append_refuses_to_overwrite_corrupt_file(tmp_path):
+    history_file = tmp_path / 'h.json'
+    history_file.write_text('{"version": 2, "items": [', encoding='utf-8')
+    store = HistoryStore(str(history_file))
+    store.load()
+
+    assert store.append(make_item(1)) is False
+    assert history_file.read_text(encoding='utf-8') == '{"version": 2, "items": ['
@@ -0,0 +1,182 @@
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+pytest.importorskip('openai')
+pytest.importorskip('dotenv')
+
+import tarot_client
+from history_store import HistoryStore, resolve_cards
+from tarot_client import send_request
+from tarot_daemon import TarotDaemon, remove_stale_socket
+
+
+class StubClient:
+    """按固定片段流式返回内容的 OpenAI 客户端替身"""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        for piece in self.pieces:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+
+@pytest.fixture
+def socket_dir():
+    # Unix 套接字路径长度有限，不使用较长的 tmp_path
+    path = tempfile.mkdtemp(prefix='tarot-')
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def daemon(socket_dir):
+    store = HistoryStore(os.path.join(socket_dir, 'h.json'))
+    server = TarotDaemon(os.path.join(socket_dir, 'd.sock'), history_store=store,
+                         client=StubClient(['你好', '，', '世界']), model_name='stub')
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def request(server, payload):
+    return list(send_request(payload, server.socket_path))
+
+
+def test_ping(daemon):
+    assert request(daemon, {'command': 'ping'}) == [{'type': 'pong', 'pid': os.getpid()}]
+
+
+def test_read_streams_cards_deltas_and_saves_history(daemon):
+    events = request(daemon, {'command': 'read', 'question': '测试', 'num_cards': 3})
+
+    assert events[0]['type'] == 'cards'
+    assert len(events[0]['cards']) == 3
+    assert [event['type'] for event in events[1:]] == ['delta'] * 3 + ['done']
+    assert ''.join(event['text'] for event in events[1:-1]) == '你好，世界'
+
+    items = HistoryStore(daemon.history_store.history_file).load()
+    assert len(items) == 1
+    assert items[0]['question'] == '测试'
+    assert items[0]['analysis'] == '你好，世界'
+    assert resolve_cards(items[0]) == events[0]['cards']
+
+
+@pytest.mark.parametrize('payload', [
+    [1, 2],
+    {'command': 'read', 'question': '测试', 'num_cards': 1.0},
+    {'command': 'read', 'question': '测试', 'num_cards': True},
+    {'command': 'read', 'question': '测试', 'num_cards': 2},
+    {'command': 'read', 'question': '  ', 'num_cards': 1},
+    {'command': 'unknown'},
+])
+def test_invalid_requests_return_single_error(daemon, payload):
+    events = request(daemon, payload)
+    assert len(events) == 1
+    assert events[0]['type'] == 'error'
+    assert not os.path.exists(daemon.history_store.history_file)
+
+
+def test_malformed_json_returns_error(daemon):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(daemon.socket_path)
+        sock.sendall(b'{not json\n')
+        response = sock.makefile('rb').read()
+    assert [json.loads(line)['type'] for line in response.splitlines()] == ['error']
+
+
+def test_read_without_client_returns_error(daemon):
+    daemon.client = None
+    daemon.client_error = '未配置'
+    events = request(daemon, {'command': 'read', 'question': '测试', 'num_cards': 1})
+    assert events == [{'type': 'error', 'message': '未初始化OpenAI客户端: 未配置'}]
+
+
+def test_shutdown_stops_server(socket_dir):
+    store = HistoryStore(os.path.join(socket_dir, 'h.json'))
+    server = TarotDaemon(os.path.join(socket_dir, 'd.sock'), history_store=store,
+                         client=StubClient([]), model_name='stub')
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    assert request(server, {'command': 'shutdown'}) == [{'type': 'done'}]
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    server.server_close()
+    assert not os.path.exists(server.socket_path)
+
+
+def test_remove_stale_socket_cleans_up_dead_socket(socket_dir):
+    path = os.path.join(socket_dir, 'stale.sock')
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    sock.close()
+
+    remove_stale_socket(path)
+    assert not os.path.exists(path)
+
+
+def test_remove_stale_socket_refuses_running_daemon(daemon):
+    with pytest.raises(RuntimeError):
+        remove_stale_socket(daemon.socket_path)
+    assert os.path.exists(daemon.socket_path)
+
+
+def test_remove_stale_socket_keeps_regular_file(socket_dir):
+    path = os.path.join(socket_dir, 'data.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('user data')
+
+    with pytest.raises(RuntimeError):
+        remove_stale_socket(path)
+    assert os.path.exists(path)
+
+
+def run_client(socket_path, *args):
+    with mock.patch.object(sys, 'argv', ['tarot_client.py', '--socket', socket_path] + list(args)):
+        try:
+            tarot_client.main()
+        except SystemExit as e:
+            return e.code
+    return 0
+
+
+def test_client_exit_codes(daemon, socket_dir, capsys):
+    assert run_client(daemon.socket_path, '-n', '1', '测试') == 0
+    assert '你好，世界' in capsys.readouterr().out
+    assert run_client(daemon.socket_path, '--ping') == 0
+    assert run_client(os.path.join(socket_dir, 'missing.sock'), '--ping') == 1
+
+
+def test_client_fails_when_stream_ends_without_done(socket_dir):
+    path = os.path.join(socket_dir, 'partial.sock')
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(1)
+
+    def serve_partial():
+        conn, _ = listener.accept()
+        with conn:
+            conn.recv(1024)
+            conn.sendall(b'{"type": "delta", "text": "hi"}\n')
+
+    thread = threading.Thread(target=serve_partial)
+    thread.start()
+    try:
+        assert run_client(path, '测试') == 1
+    finally:
+        thread.join()
+        listener.close()
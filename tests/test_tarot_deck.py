@@ -0,0 +1,13 @@
+from tarot_deck import TarotDeck, get_card_catalog
+
+
+def test_seed_reproduces_draw():
+    first = [str(card) for card in TarotDeck(seed=42).draw(10)]
+    second = [str(card) for card in TarotDeck(seed=42).draw(10)]
+    assert first == second
+
+
+def test_catalog_ids_are_positions():
+    catalog = get_card_catalog()
+    assert len(catalog) == 78
+    assert [card.card_id for card in catalog] == list(range(78))